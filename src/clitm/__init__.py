@@ -9,6 +9,7 @@ def cli():
         print("  clitm            Run the TempMail CLI interface")
         print("  clitm -h         Show this help message")
         print("  clitm -info      Show developer information")
+        print("  clitm bench-load Stress-test inbox throughput (see bench-load -h)")
         sys.exit(0)
 
     elif len(sys.argv) == 2 and sys.argv[1] == '-info':
@@ -18,5 +19,9 @@ def cli():
         print("Repository: https://github.com/siddharthguptapydev/clitm")
         sys.exit(0)
 
+    elif len(sys.argv) >= 2 and sys.argv[1] == 'bench-load':
+        from .bench import bench_load
+        sys.exit(bench_load(sys.argv[2:]))
+
     else:
         run_tempmail()
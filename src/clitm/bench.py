@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import resource
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import main as clitm_main
+
+BENCH_DOMAIN = 'bench.local'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def deep_sizeof(obj, seen=None):
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+# In-memory stand-in for the Mail.tm endpoints clitm talks to.
+class FakeMailbox:
+
+    def __init__(self, page_size=0):
+        self.page_size = page_size
+        self.messages = []
+        self.by_id = {}
+        self.lock = threading.Lock()
+
+    def inject(self, body_size, sent_times):
+        mid = uuid.uuid4().hex
+        with self.lock:
+            n = len(self.by_id)
+        body = ('x' * 63 + '\n') * (body_size // 64) + 'x' * (body_size % 64)
+        msg = {
+            'id': mid,
+            'from': {'address': f"sender{n % 17}@{BENCH_DOMAIN}", 'name': ''},
+            'to': [{'address': f"inbox@{BENCH_DOMAIN}", 'name': ''}],
+            'subject': f"Load test {n % 50}",
+            'intro': body[:120],
+            'text': body,
+            'seen': False,
+        }
+        with self.lock:
+            sent = time.time()
+            msg['createdAt'] = datetime.fromtimestamp(sent, timezone.utc).isoformat()
+            sent_times[mid] = sent
+            self.messages.insert(0, msg)
+            self.by_id[mid] = msg
+        return mid
+
+    def summaries(self):
+        with self.lock:
+            msgs = self.messages[:self.page_size] if self.page_size else list(self.messages)
+        return [{k: v for k, v in m.items() if k != 'text'} for m in msgs]
+
+    def get(self, mid):
+        with self.lock:
+            return self.by_id.get(mid)
+
+    def delete(self, mid):
+        with self.lock:
+            msg = self.by_id.pop(mid, None)
+            if msg is not None:
+                self.messages.remove(msg)
+            return msg is not None
+
+
+def make_handler(mailbox):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload=None):
+            data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/domains':
+                self._send(200, {'hydra:member': [{'domain': BENCH_DOMAIN}]})
+            elif self.path == '/messages':
+                self._send(200, {'hydra:member': mailbox.summaries()})
+            elif self.path.startswith('/messages/'):
+                msg = mailbox.get(self.path[len('/messages/'):])
+                self._send(200, msg) if msg else self._send(404, {'detail': 'Not Found'})
+            else:
+                self._send(404, {'detail': 'Not Found'})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if self.path == '/accounts':
+                self._send(201, {'id': uuid.uuid4().hex})
+            elif self.path == '/token':
+                self._send(200, {'token': uuid.uuid4().hex})
+            else:
+                self._send(404, {'detail': 'Not Found'})
+
+        def do_DELETE(self):
+            if self.path.startswith('/messages/') and mailbox.delete(self.path[len('/messages/'):]):
+                self._send(204)
+            else:
+                self._send(404, {'detail': 'Not Found'})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_server(mailbox, port=0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(mailbox))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def inject_messages(mailbox, sent, rate, duration, body_size, timing):
+    start = time.time()
+    timing['started'] = start
+    count = int(rate * duration)
+    for i in range(count):
+        delay = start + i / rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        mailbox.inject(body_size, sent)
+    timing['finished'] = time.time()
+
+
+def run_load(rate, duration, body_size, interval, page_size, late_after, drain, open_every):
+    mailbox = FakeMailbox(page_size=page_size)
+    server, url = start_fake_server(mailbox)
+    old_api_base = clitm_main.API_BASE
+    clitm_main.API_BASE = url
+
+    try:
+        session, address = clitm_main.create_account()
+        state = clitm_main.InboxState(session, address)
+        state.update_messages()
+
+        seen = set()
+        base_messages = deep_sizeof(state.index.by_id, seen)
+        base_index = deep_sizeof(state.index, seen)
+        base_cpu = time.process_time()
+        client_cpu = 0.0
+
+        sent = {}
+        latencies = {}
+        poll_times = []
+        read_times = []
+        opened = 0
+        empty_polls = 0
+        timing = {}
+
+        injector = threading.Thread(
+            target=inject_messages, args=(mailbox, sent, rate, duration, body_size, timing), daemon=True)
+        started = time.time()
+        injector.start()
+
+        # The drain window only starts once the injector is done, so a slow
+        # injector is not mistaken for messages the client failed to pick up.
+        deadline = None
+        while deadline is None or time.time() < deadline:
+            t0 = time.time()
+            c0 = time.thread_time()
+            added = state.update_messages()
+            client_cpu += time.thread_time() - c0
+            t1 = time.time()
+            poll_times.append(t1 - t0)
+            if sent and not len(state.index):
+                empty_polls += 1
+            for m in added:
+                ts = sent.get(m.get('id'))
+                if ts is not None:
+                    latencies.setdefault(m['id'], t1 - ts)
+            if open_every:
+                for m in added[::open_every]:
+                    r0 = time.time()
+                    c0 = time.thread_time()
+                    clitm_main.build_message_view(clitm_main.read_message(state.session, m['id']), 80)
+                    client_cpu += time.thread_time() - c0
+                    read_times.append(time.time() - r0)
+                    opened += 1
+            if deadline is None and not injector.is_alive():
+                deadline = time.time() + drain
+            if deadline is not None and len(latencies) >= len(sent):
+                break
+            time.sleep(max(0, interval - (time.time() - t0)))
+
+        injector.join()
+        process_cpu = time.process_time() - base_cpu
+        elapsed = time.time() - started
+
+        seen = set()
+        messages_bytes = deep_sizeof(state.index.by_id, seen) - base_messages
+        index_bytes = deep_sizeof(state.index, seen) - base_index
+        inject_elapsed = timing['finished'] - timing['started']
+
+        return {
+            'address': address,
+            'injected': len(sent),
+            'target_rate': rate,
+            'inject_rate': len(sent) / max(inject_elapsed, 1e-9),
+            'delivered': len(latencies),
+            'dropped': len(sent) - len(latencies),
+            'late': sum(1 for v in latencies.values() if v > late_after),
+            'latencies': list(latencies.values()),
+            'poll_times': poll_times,
+            'empty_polls': empty_polls,
+            'elapsed': elapsed,
+            'client_cpu': client_cpu,
+            'process_cpu': process_cpu,
+            'read_times': read_times,
+            'opened': opened,
+            'messages_bytes': messages_bytes,
+            'index_bytes': index_bytes,
+            'message_count': len(state.index),
+            'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+        clitm_main.API_BASE = old_api_base
+
+
+def print_report(result, late_after):
+    lat = result['latencies']
+    polls = result['poll_times']
+    delivered = max(1, result['delivered'])
+    count = max(1, result['message_count'])
+
+    print(f"Mailbox: {result['address']}")
+    print(f"Injection: {result['inject_rate']:.1f} msg/s achieved of {result['target_rate']:g} msg/s target")
+    print(f"Injected: {result['injected']}  Delivered: {result['delivered']}  "
+          f"Dropped: {result['dropped']}  Late (>{late_after:g}s): {result['late']}")
+    print(f"Throughput: {result['delivered'] / max(result['elapsed'], 1e-9):.1f} msg/s over {result['elapsed']:.1f}s")
+    print("Delivery latency (s): " + '  '.join(
+        f"p{p}={percentile(lat, p):.3f}" for p in (50, 90, 99)) + f"  max={max(lat or [0]):.3f}")
+    print("update_messages() (ms): " + '  '.join(
+        f"p{p}={percentile(polls, p) * 1000:.1f}" for p in (50, 90, 99)) + f"  polls={len(polls)}"
+          + f"  empty/failed={result['empty_polls']}")
+    if result['opened']:
+        print("read_message() (ms): " + '  '.join(
+            f"p{p}={percentile(result['read_times'], p) * 1000:.1f}" for p in (50, 90, 99))
+            + f"  opened={result['opened']}")
+    print(f"Client CPU: {result['client_cpu']:.2f}s, {result['client_cpu'] / delivered * 1000:.3f} ms per message")
+    print(f"Process CPU (incl. fake server and injector): {result['process_cpu']:.2f}s")
+    print(f"Retained messages: {result['message_count']}, +{result['messages_bytes'] / 1024:.1f} KiB "
+          f"({result['messages_bytes'] / count:.0f} B/msg)")
+    print(f"Sort/group structures: +{result['index_bytes'] / 1024:.1f} KiB  "
+          f"Peak RSS: {result['maxrss_kb'] / 1024:.1f} MiB")
+
+
+def bench_load(argv):
+    parser = argparse.ArgumentParser(
+        prog='clitm bench-load',
+        description='Stress a clitm inbox against a local fake Mail.tm server.',
+    )
+    parser.add_argument('--rate', type=float, default=50.0, help='messages injected per second (default: 50)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to inject for (default: 10)')
+    parser.add_argument('--body-size', type=int, default=1024,
+                        help='message body size in bytes; polls only carry a 120-character intro, so the body '
+                             'reaches the client through the messages opened with --open-every (default: 1024)')
+    parser.add_argument('--interval', type=float, default=clitm_main.POLL_INTERVAL,
+                        help=f"poll interval in seconds (default: {clitm_main.POLL_INTERVAL:g})")
+    parser.add_argument('--page-size', type=int, default=0,
+                        help='messages returned per poll, 0 for all; Mail.tm returns 30 (default: 0)')
+    parser.add_argument('--open-every', type=int, default=10,
+                        help='open every Nth new message with read_message(), 0 to disable (default: 10)')
+    parser.add_argument('--late-after', type=float, default=None,
+                        help='latency in seconds counted as late (default: twice the poll interval)')
+    parser.add_argument('--drain', type=float, default=None,
+                        help='seconds to keep polling after injection stops (default: three poll intervals)')
+    args = parser.parse_args(argv)
+
+    if args.rate <= 0 or args.duration <= 0 or args.interval <= 0:
+        parser.error('rate, duration and interval must be positive')
+    if args.body_size < 0 or args.page_size < 0 or args.open_every < 0:
+        parser.error('body size, page size and open-every must not be negative')
+
+    late_after = args.late_after if args.late_after is not None else 2 * args.interval
+    drain = args.drain if args.drain is not None else 3 * args.interval
+
+    print(f"Injecting {args.rate:g} msg/s for {args.duration:g}s ({args.body_size} B bodies), "
+          f"polling every {args.interval:g}s...")
+    try:
+        result = run_load(args.rate, args.duration, args.body_size, args.interval, args.page_size, late_after, drain,
+                          args.open_every)
+    except Exception as e:
+        print(f"Load test failed: {e}")
+        return 1
+
+    print_report(result, late_after)
+    return 0
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+import requests
+
+HOOKS_FILE = os.path.join('~', '.config', 'clitm', 'hooks.json')
+HOOK_TYPES = ('command', 'http', 'file')
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_TIMEOUT = 10.0
+STOP_TIMEOUT = 5.0
+
+
+def hooks_path():
+    return os.path.expanduser(os.environ.get('CLITM_HOOKS') or HOOKS_FILE)
+
+
+def build_event(address, msg):
+    return {
+        'event': 'message.new',
+        'address': address,
+        'received': time.time(),
+        'message': msg,
+    }
+
+
+def run_command_hook(hook, event):
+    msg = event['message']
+    env = dict(os.environ)
+    env.update({
+        'CLITM_ADDRESS': event['address'] or '',
+        'CLITM_MESSAGE_ID': str(msg.get('id') or ''),
+        'CLITM_SUBJECT': msg.get('subject') or '',
+        'CLITM_FROM': (msg.get('from') or {}).get('address') or '',
+    })
+    command = hook['command']
+    try:
+        r = subprocess.run(
+            command,
+            shell=isinstance(command, str),
+            input=json.dumps(event).encode('utf-8'),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=env,
+            timeout=hook['timeout'],
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"timed out after {hook['timeout']}s")
+    except OSError as e:
+        raise RuntimeError(f"could not run command: {e}")
+    if r.returncode != 0:
+        raise RuntimeError(f"exit status {r.returncode} - {r.stderr.decode('utf-8', 'replace')[:200]}")
+
+
+def run_http_hook(hook, event):
+    try:
+        r = requests.post(hook['url'], json=event, headers=hook.get('headers') or {}, timeout=hook['timeout'])
+    except Exception as e:
+        raise RuntimeError(f"network error: {e}")
+    if r.status_code >= 400:
+        raise RuntimeError(f"HTTP {r.status_code} - {r.text[:200]}")
+
+
+def run_file_hook(hook, event):
+    try:
+        with open(hook['path'], 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event) + '\n')
+    except OSError as e:
+        raise RuntimeError(f"could not write {hook['path']}: {e}")
+
+
+HOOK_RUNNERS = {
+    'command': run_command_hook,
+    'http': run_http_hook,
+    'file': run_file_hook,
+}
+
+
+def parse_hook(raw, default_timeout, position):
+    if not isinstance(raw, dict):
+        raise RuntimeError(f"Hook entry must be an object, got {raw!r}")
+    kind = raw.get('type')
+    if kind not in HOOK_TYPES:
+        raise RuntimeError(f"Unknown hook type {kind!r} (expected one of {', '.join(HOOK_TYPES)})")
+
+    hook = dict(raw)
+    hook['name'] = raw.get('name') or f"{kind} #{position}"
+    try:
+        hook['timeout'] = float(raw.get('timeout', default_timeout))
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Hook {hook['name']!r} has an invalid timeout")
+
+    if kind == 'command' and not isinstance(raw.get('command'), (str, list)):
+        raise RuntimeError(f"Hook {hook['name']!r} needs a 'command' string or list")
+    if kind == 'http' and not raw.get('url'):
+        raise RuntimeError(f"Hook {hook['name']!r} needs a 'url'")
+    if kind == 'file':
+        if not raw.get('path'):
+            raise RuntimeError(f"Hook {hook['name']!r} needs a 'path'")
+        hook['path'] = os.path.expanduser(raw['path'])
+    return hook
+
+
+def load_hooks(path, on_error=None):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        raise RuntimeError(f"Could not read hooks file {path}: {e}")
+
+    if not isinstance(config, dict):
+        raise RuntimeError(f"Hooks file {path} must contain a JSON object")
+
+    default_timeout = config.get('timeout', DEFAULT_TIMEOUT)
+    hooks = [parse_hook(raw, default_timeout, i) for i, raw in enumerate(config.get('hooks') or [], 1)]
+    if not hooks:
+        return None
+
+    try:
+        workers = int(config.get('workers', DEFAULT_WORKERS))
+        queue_size = int(config.get('queue_size', DEFAULT_QUEUE_SIZE))
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Hooks file {path} has an invalid 'workers' or 'queue_size'")
+
+    return HookDispatcher(hooks, workers=workers, queue_size=queue_size, on_error=on_error)
+
+
+# Ids only count as seen once queued, so a full queue defers a message to the next poll.
+class HookDispatcher:
+    def __init__(self, hooks, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, on_error=None):
+        self.hooks = hooks
+        self.on_error = on_error
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.seen = set()
+        self.lock = threading.Lock()
+
+        self.fired = 0
+        self.failed = 0
+        self.deferred = set()
+
+        self.threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(max(1, workers))
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, msgs, address):
+        queued = 0
+        full = False
+        with self.lock:
+            for m in msgs:
+                mid = m.get('id')
+                if mid is None or mid in self.seen:
+                    continue
+                if not full:
+                    try:
+                        self.queue.put_nowait(build_event(address, m))
+                    except queue.Full:
+                        full = True
+                if full:
+                    self.deferred.add(mid)
+                    continue
+                self.seen.add(mid)
+                self.deferred.discard(mid)
+                queued += 1
+        return queued
+
+    def _worker(self):
+        while True:
+            event = self.queue.get()
+            try:
+                if event is None:
+                    return
+                for hook in self.hooks:
+                    self._run(hook, event)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, hook, event):
+        try:
+            HOOK_RUNNERS[hook['type']](hook, event)
+            with self.lock:
+                self.fired += 1
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+            if self.on_error is not None:
+                try:
+                    self.on_error(f"Hook {hook['name']} failed: {e}")
+                except Exception:
+                    pass
+
+    # Returns (events never started, deferred ids never queued, events still running).
+    def stop(self, timeout=STOP_TIMEOUT):
+        deadline = time.time() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks and time.time() < deadline:
+                self.queue.all_tasks_done.wait(max(0, deadline - time.time()))
+
+        not_started = 0
+        while True:
+            try:
+                event = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.queue.task_done()
+            if event is not None:
+                not_started += 1
+        running = self.queue.unfinished_tasks
+
+        for _ in self.threads:
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                break
+        for t in self.threads:
+            t.join(timeout=max(0, deadline - time.time()))
+        with self.lock:
+            return not_started, len(self.deferred), running
@@ -11,10 +11,22 @@ import random
 import textwrap
 import os
 import re
+import bisect
+from datetime import datetime
+
+try:
+    from .hooks import hooks_path, load_hooks
+except ImportError:
+    from hooks import hooks_path, load_hooks
 
 API_BASE = "https://api.mail.tm"
 POLL_INTERVAL = 4.0
 
+SORT_MODES = ('date', 'sender', 'subject')
+GROUP_MODES = (None, 'thread', 'sender')
+
+SUBJECT_PREFIX_RE = re.compile(r'^\s*((re|fwd?|aw|sv)\s*(\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+
 
 def random_string(length=10):
     chars = string.ascii_lowercase + string.digits
@@ -100,13 +112,160 @@ def delete_message_api(session, msg_id):
     return True
 
 
+def normalize_subject(subject):
+    subject = SUBJECT_PREFIX_RE.sub('', subject or '')
+    return re.sub(r"\s+", " ", subject).strip().lower()
+
+
+def normalize_sender(msg):
+    return ((msg.get('from') or {}).get('address') or '').strip().lower()
+
+
+def message_timestamp(msg):
+    value = msg.get('createdAt') or msg.get('date') or ''
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def sort_key(msg, mode):
+    ts = message_timestamp(msg)
+    mid = str(msg.get('id'))
+    if mode == 'sender':
+        return (normalize_sender(msg), -ts, mid)
+    if mode == 'subject':
+        return (normalize_subject(msg.get('subject')), -ts, mid)
+    return (-ts, mid)
+
+
+def group_key(msg, mode):
+    if mode == 'sender':
+        return normalize_sender(msg)
+    return normalize_subject(msg.get('subject'))
+
+
+# Sorted (key, id) lists per sort mode, per-group buckets and the order of the
+# groups themselves, all patched message by message so mode switches never sort.
+class MessageIndex:
+    def __init__(self):
+        self.by_id = {}
+        self.keys = {}
+        self.order = {mode: [] for mode in SORT_MODES}
+        self.groups = {mode: {} for mode in GROUP_MODES if mode}
+        self.group_order = {gmode: {mode: [] for mode in SORT_MODES} for gmode in self.groups}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _keys_for(self, msg):
+        sorts = {mode: sort_key(msg, mode) for mode in SORT_MODES}
+        groups = {mode: group_key(msg, mode) for mode in self.groups}
+        return sorts, groups
+
+    def _insert(self, mid, msg):
+        sorts, groups = self._keys_for(msg)
+        self.by_id[mid] = msg
+        self.keys[mid] = (sorts, groups)
+        for mode, key in sorts.items():
+            bisect.insort(self.order[mode], (key, mid))
+        for gmode, gkey in groups.items():
+            bucket = self.groups[gmode].setdefault(gkey, {mode: [] for mode in SORT_MODES})
+            for mode, key in sorts.items():
+                entries = bucket[mode]
+                old_head = entries[0][0] if entries else None
+                bisect.insort(entries, (key, mid))
+                self._move_group(gmode, mode, gkey, old_head, entries)
+
+    def _remove(self, mid):
+        sorts, groups = self.keys.pop(mid)
+        del self.by_id[mid]
+        for mode, key in sorts.items():
+            entries = self.order[mode]
+            del entries[bisect.bisect_left(entries, (key, mid))]
+        for gmode, gkey in groups.items():
+            bucket = self.groups[gmode][gkey]
+            for mode, key in sorts.items():
+                entries = bucket[mode]
+                old_head = entries[0][0]
+                del entries[bisect.bisect_left(entries, (key, mid))]
+                self._move_group(gmode, mode, gkey, old_head, entries)
+            if not bucket[SORT_MODES[0]]:
+                del self.groups[gmode][gkey]
+
+    def _move_group(self, gmode, mode, gkey, old_head, entries):
+        new_head = entries[0][0] if entries else None
+        if new_head == old_head:
+            return
+        heads = self.group_order[gmode][mode]
+        if old_head is not None:
+            del heads[bisect.bisect_left(heads, (old_head, gkey))]
+        if new_head is not None:
+            bisect.insort(heads, (new_head, gkey))
+
+    # Returns the (added, removed, moved) change set for a fresh message list.
+    def apply(self, msgs):
+        incoming = {}
+        for m in msgs:
+            mid = m.get('id')
+            if mid is not None:
+                incoming[mid] = m
+
+        removed = [mid for mid in self.by_id if mid not in incoming]
+        for mid in removed:
+            self._remove(mid)
+
+        added = []
+        moved = []
+        for mid, m in incoming.items():
+            old = self.by_id.get(mid)
+            if old is None:
+                self._insert(mid, m)
+                added.append(m)
+            elif old is not m:
+                if old != m and self._keys_for(m) != self.keys[mid]:
+                    self._remove(mid)
+                    self._insert(mid, m)
+                    moved.append(mid)
+                else:
+                    self.by_id[mid] = m
+        return added, removed, moved
+
+    def group_label(self, group_mode, gkey):
+        bucket = self.groups[group_mode][gkey]
+        first = self.by_id[bucket['date'][0][1]]
+        if group_mode == 'sender':
+            return (first.get('from') or {}).get('address') or '(unknown sender)'
+        return first.get('subject') or '(no subject)'
+
+    def group_size(self, group_mode, gkey):
+        return len(self.groups[group_mode][gkey]['date'])
+
+    def rows(self, sort_mode, group_mode=None, collapsed=()):
+        if not group_mode:
+            return [('msg', mid) for _, mid in self.order[sort_mode]]
+
+        buckets = self.groups[group_mode]
+        rows = []
+        for _, gkey in self.group_order[group_mode][sort_mode]:
+            rows.append(('group', gkey))
+            if gkey not in collapsed:
+                rows.extend(('msg', mid) for _, mid in buckets[gkey][sort_mode])
+        return rows
+
+
 class InboxState:
     def __init__(self, session, address):
         self.session = session
         self.address = address
-        self.messages = []
         self.lock = threading.Lock()
 
+        self.index = MessageIndex()
+        self.sort_mode = SORT_MODES[0]
+        self.group_mode = None
+        self.collapsed = set()
+        self.rows = []
+
         self.selected = 0
         self.inbox_scroll = 0
 
@@ -117,16 +276,71 @@ class InboxState:
         self.status_message = None
         self.status_expire = 0
 
+        self.hooks = None
+
         self.running = True
 
     def update_messages(self):
         msgs = get_messages(self.session)
         with self.lock:
-            self.messages = msgs
-            if self.selected >= len(self.messages):
-                self.selected = max(0, len(self.messages) - 1)
-            if self.inbox_scroll > self.selected:
-                self.inbox_scroll = self.selected
+            added, removed, moved = self.index.apply(msgs)
+            if added or removed or moved:
+                self._rebuild_rows()
+        if self.hooks is not None:
+            self.hooks.submit(msgs, self.address)
+        return added
+
+    # The index holds the only copy of each message; this is just a snapshot of it.
+    @property
+    def messages(self):
+        with self.lock:
+            return list(self.index.by_id.values())
+
+    def _rebuild_rows(self):
+        current = self.rows[self.selected] if 0 <= self.selected < len(self.rows) else None
+        self.rows = self.index.rows(self.sort_mode, self.group_mode, self.collapsed)
+        if current is not None:
+            try:
+                self.selected = self.rows.index(current)
+            except ValueError:
+                pass
+        if self.selected >= len(self.rows):
+            self.selected = max(0, len(self.rows) - 1)
+        if self.inbox_scroll > self.selected:
+            self.inbox_scroll = self.selected
+
+    def cycle_sort_mode(self):
+        with self.lock:
+            self.sort_mode = SORT_MODES[(SORT_MODES.index(self.sort_mode) + 1) % len(SORT_MODES)]
+            self._rebuild_rows()
+            return self.sort_mode
+
+    def cycle_group_mode(self):
+        with self.lock:
+            self.group_mode = GROUP_MODES[(GROUP_MODES.index(self.group_mode) + 1) % len(GROUP_MODES)]
+            self.collapsed = set()
+            self._rebuild_rows()
+            return self.group_mode
+
+    def selected_row(self):
+        with self.lock:
+            if 0 <= self.selected < len(self.rows):
+                return self.rows[self.selected]
+            return None
+
+    def selected_message_id(self):
+        row = self.selected_row()
+        if row is not None and row[0] == 'msg':
+            return row[1]
+        return None
+
+    def toggle_group(self, gkey):
+        with self.lock:
+            if gkey in self.collapsed:
+                self.collapsed.discard(gkey)
+            else:
+                self.collapsed.add(gkey)
+            self._rebuild_rows()
 
 
 def poller(state: InboxState):
@@ -324,7 +538,7 @@ def draw_inbox(stdscr, state: InboxState):
 
     safe_hline(stdscr, 1, 0, w)
 
-    help_line = " ↑/↓ move  Enter open  d delete  s save  q quit "
+    help_line = " ↑/↓ move  Enter open/fold  d delete  s save  o sort  g group  q quit "
     try:
         stdscr.attron(curses.color_pair(3))
         stdscr.addnstr(2, 0, help_line[:max(0, w - 1)], max(0, w - 1))
@@ -336,39 +550,49 @@ def draw_inbox(stdscr, state: InboxState):
     content_h = max(0, h - content_y - 2)
 
     with state.lock:
-        msgs = list(state.messages)
+        total = len(state.rows)
+        count = len(state.index)
         sel = state.selected
         scroll = state.inbox_scroll
 
-    if not msgs:
+        if scroll < 0:
+            scroll = 0
+        if scroll > max(0, total - 1):
+            scroll = max(0, total - 1)
+
+        if sel < scroll:
+            scroll = sel
+        if sel >= scroll + content_h:
+            scroll = sel - content_h + 1
+
+        state.inbox_scroll = scroll
+
+        visible = []
+        for kind, key in state.rows[scroll:scroll + content_h]:
+            if kind == 'group':
+                mark = '[+]' if key in state.collapsed else '[-]'
+                label = state.index.group_label(state.group_mode, key)
+                size = state.index.group_size(state.group_mode, key)
+                visible.append(f"{mark} {label} ({size})")
+            else:
+                m = state.index.by_id[key]
+                subj = m.get('subject') or '(no subject)'
+                from_field = (m.get('from') or {}).get('address') or ''
+                date_field = (m.get('createdAt') or '')[:19]
+                indent = '    ' if state.group_mode else ''
+                left = f"{indent}{from_field:<25.25}  {subj:<40.40}"
+                visible.append(f"{left}  {date_field}")
+        view = f"sort: {state.sort_mode}, group: {state.group_mode or 'none'}"
+
+    if not total:
         stdscr.addnstr(content_y, 0, "Inbox is empty. Waiting for messages..."[:max(0, w - 1)], max(0, w - 1))
         draw_status(stdscr, state)
         stdscr.refresh()
         return
 
-    if scroll < 0:
-        scroll = 0
-    if scroll > max(0, len(msgs) - 1):
-        scroll = max(0, len(msgs) - 1)
-
-    if sel < scroll:
-        scroll = sel
-    if sel >= scroll + content_h:
-        scroll = sel - content_h + 1
-
-    state.inbox_scroll = scroll
-
-    for i in range(content_h):
+    for i, line in enumerate(visible):
         idx = scroll + i
         y = content_y + i
-        if idx >= len(msgs):
-            break
-        m = msgs[idx]
-        subj = m.get('subject') or '(no subject)'
-        from_field = m.get('from', {}).get('address', '')
-        date_field = m.get('createdAt', '')[:19]
-        left = f"{from_field:<25.25}  {subj:<40.40}"
-        line = f"{left}  {date_field}"
         try:
             if idx == sel:
                 stdscr.attron(curses.color_pair(4))
@@ -379,7 +603,7 @@ def draw_inbox(stdscr, state: InboxState):
         except Exception:
             stdscr.addnstr(y, 0, line[:max(0, w - 1)], max(0, w - 1))
 
-    status = f"{len(msgs)} messages — showing {scroll + 1}-{min(len(msgs), scroll + content_h)}"
+    status = f"{count} messages — showing {scroll + 1}-{min(total, scroll + content_h)} — {view}"
     try:
         stdscr.attron(curses.color_pair(3))
         stdscr.addnstr(h - 1, 0, status[:max(0, w - 1)], max(0, w - 1))
@@ -529,8 +753,8 @@ def delete_and_notify(state: InboxState, msg_id):
         state.update_messages()
         set_status(state, "Message deleted", duration=3.0)
         with state.lock:
-            if state.selected >= len(state.messages):
-                state.selected = max(0, len(state.messages) - 1)
+            if state.selected >= len(state.rows):
+                state.selected = max(0, len(state.rows) - 1)
     except Exception as e:
         set_status(state, f"Delete failed: {e}", duration=4.0)
 
@@ -566,19 +790,18 @@ def main_curses(stdscr, state: InboxState):
                             state.inbox_scroll = state.selected
             elif ch == curses.KEY_DOWN:
                 with state.lock:
-                    if state.selected < max(0, len(state.messages) - 1):
+                    if state.selected < max(0, len(state.rows) - 1):
                         state.selected += 1
                         h, w = stdscr.getmaxyx()
                         content_h = max(0, h - 4 - 2)
                         if state.selected >= state.inbox_scroll + content_h:
                             state.inbox_scroll = state.selected - content_h + 1
             elif ch in (10, 13):
-                with state.lock:
-                    if 0 <= state.selected < len(state.messages):
-                        mid = state.messages[state.selected].get('id')
-                    else:
-                        mid = None
-                if mid is not None:
+                row = state.selected_row()
+                mid = row[1] if row is not None and row[0] == 'msg' else None
+                if row is not None and row[0] == 'group':
+                    state.toggle_group(row[1])
+                elif mid is not None:
                     try:
                         msg = read_message(state.session, mid)
                         state.open_message = msg
@@ -591,11 +814,7 @@ def main_curses(stdscr, state: InboxState):
             elif ch in (127, curses.KEY_BACKSPACE, 8):
                 pass
             elif ch in (ord('d'), ord('D')):
-                with state.lock:
-                    if 0 <= state.selected < len(state.messages):
-                        mid = state.messages[state.selected].get('id')
-                    else:
-                        mid = None
+                mid = state.selected_message_id()
                 if mid is None:
                     set_status(state, "No message selected to delete", duration=3.0)
                 else:
@@ -605,11 +824,7 @@ def main_curses(stdscr, state: InboxState):
                     else:
                         set_status(state, "Delete canceled", duration=2.0)
             elif ch in (ord('s'), ord('S')):
-                with state.lock:
-                    if 0 <= state.selected < len(state.messages):
-                        mid = state.messages[state.selected].get('id')
-                    else:
-                        mid = None
+                mid = state.selected_message_id()
                 if mid is None:
                     set_status(state, "No message selected to save", duration=3.0)
                 else:
@@ -618,6 +833,12 @@ def main_curses(stdscr, state: InboxState):
                         threading.Thread(target=save_and_notify, args=(state, msg), daemon=True).start()
                     except Exception as e:
                         set_status(state, f"Failed to fetch for save: {e}", duration=4.0)
+            elif ch in (ord('o'), ord('O')):
+                mode = state.cycle_sort_mode()
+                set_status(state, f"Sorted by {mode}", duration=2.0)
+            elif ch in (ord('g'), ord('G')):
+                mode = state.cycle_group_mode()
+                set_status(state, f"Grouped by {mode}" if mode else "Grouping off", duration=2.0)
         else:
             if ch == curses.KEY_UP:
                 if state.msg_scroll > 0:
@@ -635,16 +856,31 @@ def main_curses(stdscr, state: InboxState):
 
 
 def main():
+    path = hooks_path()
+    try:
+        hooks = load_hooks(path)
+    except Exception as e:
+        print(f"Failed to load hooks: {e}")
+        return
+    if hooks is not None:
+        print(f"Loaded {len(hooks.hooks)} hook(s) from {path}")
+
     print("Creating temporary mailbox (Mail.tm)...")
     try:
         session, address = create_account()
     except Exception as e:
         print(f"Failed to create mailbox: {e}")
+        if hooks is not None:
+            hooks.stop()
         return
 
     print(f"Your temporary mailbox: {address}")
 
     state = InboxState(session, address)
+    if hooks is not None:
+        hooks.on_error = lambda text: set_status(state, text, duration=4.0)
+        state.hooks = hooks
+
     state.update_messages()
 
     t = threading.Thread(target=poller, args=(state,), daemon=True)
@@ -655,6 +891,12 @@ def main():
     finally:
         state.running = False
         t.join(timeout=1)
+        if state.hooks is not None:
+            not_started, deferred, running = state.hooks.stop()
+            print(f"Hooks: {state.hooks.fired} run(s) succeeded, {state.hooks.failed} failed")
+            if not_started or deferred or running:
+                print(f"Hooks not fired at exit: {not_started} queued event(s) never started, "
+                      f"{deferred} message(s) deferred by a full queue, {running} event(s) still running")
 
 
 if __name__ == '__main__':